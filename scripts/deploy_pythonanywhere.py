@@ -1,11 +1,30 @@
+import http.client
+import json
 import mimetypes
 import os
 import sys
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import quote
 from urllib.request import Request, urlopen
 
+UPLOAD_WORKERS = 16
+
+_local = threading.local()
+
+
+def _connection(host):
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "host", None) != host:
+        if conn is not None:
+            conn.close()
+        conn = http.client.HTTPSConnection(host)
+        _local.conn = conn
+        _local.host = host
+    return conn
+
 
 def build_multipart(field_name, filename, content, boundary):
     lines = []
@@ -27,17 +46,28 @@ def upload_file(host, username, token, local_path, remote_path):
         content = handle.read()
 
     body = build_multipart("content", os.path.basename(local_path), content, boundary)
-    url = (
-        f"https://{host}/api/v0/user/{username}/files/path"
-        f"{quote(remote_path, safe='/')}"
+    url_path = (
+        f"/api/v0/user/{username}/files/path{quote(remote_path, safe='/')}"
     )
-    request = Request(url, data=body, method="POST")
-    request.add_header("Authorization", f"Token {token}")
-    request.add_header("Content-Type", f"multipart/form-data; boundary={boundary}")
-    request.add_header("Content-Length", str(len(body)))
-    with urlopen(request) as response:
-        if response.status not in (200, 201):
-            raise RuntimeError(f"Upload failed for {remote_path}: {response.status}")
+    headers = {
+        "Authorization": f"Token {token}",
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(body)),
+    }
+    conn = _connection(host)
+    try:
+        conn.request("POST", url_path, body, headers)
+        response = conn.getresponse()
+    except (http.client.HTTPException, OSError):
+        # Stale keep-alive connection; reconnect and retry once.
+        conn.close()
+        _local.conn = None
+        conn = _connection(host)
+        conn.request("POST", url_path, body, headers)
+        response = conn.getresponse()
+    response.read()
+    if response.status not in (200, 201):
+        raise RuntimeError(f"Upload failed for {remote_path}: {response.status}")
 
 
 def reload_webapp(host, username, token, domain):
@@ -71,21 +101,44 @@ def main():
         raise SystemExit("PA_USERNAME and PA_TOKEN are required.")
 
     repo_root = Path(__file__).resolve().parents[1]
-    uploaded = 0
+    manifest_path = repo_root / ".deploy-manifest.json"
+    try:
+        old_manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        old_manifest = {}
+
+    new_manifest = {}
+    to_upload = []
+    skipped = 0
     for path in repo_root.rglob("*"):
         if path.is_dir():
             continue
         rel = path.relative_to(repo_root)
         if should_skip(rel):
             continue
+        stat = path.stat()
+        entry = [stat.st_size, int(stat.st_mtime)]
+        new_manifest[rel.as_posix()] = entry
+        if old_manifest.get(rel.as_posix()) == entry:
+            skipped += 1
+            continue
+        to_upload.append((path, rel))
+
+    def upload(entry):
+        path, rel = entry
         remote_path = f"{target_root}/{rel.as_posix()}"
         upload_file(host, username, token, str(path), remote_path)
-        uploaded += 1
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+        list(executor.map(upload, to_upload))
+    uploaded = len(to_upload)
+
+    manifest_path.write_text(json.dumps(new_manifest, indent=2, sort_keys=True))
 
     if domain:
         reload_webapp(host, username, token, domain)
 
-    print(f"Uploaded {uploaded} files to {target_root}")
+    print(f"Uploaded {uploaded} files to {target_root} ({skipped} unchanged)")
     if domain:
         print(f"Reloaded webapp {domain}")
     else: